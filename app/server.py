@@ -1,45 +1,330 @@
-import json
+import asyncio
+import atexit
 import os
 import subprocess
+import threading
+import types
+from collections import deque
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-import requests
+import aiohttp
+import orjson
 from mcp.server.fastmcp import FastMCP
 
 mcp = FastMCP("pr-agent")
 
+
+def _dump(obj, pretty: bool = False) -> str:
+    """Serialize a tool response with orjson, which is considerably faster
+    than the stdlib encoder for multi-KB payloads.
+
+    Responses are compact by default; MCP clients parse them rather than
+    display them, and indenting roughly doubles the bytes produced.
+    """
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode()
+
+
+# Shared aiohttp session so Slack posts reuse one pooled connection and
+# never block the event loop; created lazily on first use.
+_http: Optional[aiohttp.ClientSession] = None
+_http_lock = asyncio.Lock()
+
+
+async def _get_http_session() -> aiohttp.ClientSession:
+    global _http
+    if _http is None or _http.closed:
+        async with _http_lock:
+            if _http is None or _http.closed:
+                _http = aiohttp.ClientSession(
+                    timeout=aiohttp.ClientTimeout(total=2)
+                )
+    return _http
+
+
+def _close_http_session():
+    if _http is not None and not _http.closed:
+        asyncio.run(_http.close())
+
+
+atexit.register(_close_http_session)
+
 TEMPLATES_DIR = Path(__file__).parent.parent / "data/templates"
 
-DEFAULT_TEMPLATES = {
-    "bug.md": "Bug Fix",
-    "feature.md": "Feature",
-    "docs.md": "Documentation",
-    "refactor.md": "Refactor",
-    "test.md": "Test",
-    "performance.md": "Performance",
-    "security.md": "Security",
-}
+# Frozen so the module-level tables can't be mutated at runtime.
+DEFAULT_TEMPLATES = types.MappingProxyType(
+    {
+        "bug.md": "Bug Fix",
+        "feature.md": "Feature",
+        "docs.md": "Documentation",
+        "refactor.md": "Refactor",
+        "test.md": "Test",
+        "performance.md": "Performance",
+        "security.md": "Security",
+    }
+)
 
 EVENTS_FILE = (
-    Path(__file__).parent.parent / "data" / "github_events" / "github_events.json"
+    Path(__file__).parent.parent / "data" / "github_events" / "github_events.jsonl"
 )
 
-TYPE_MAPPING = {
-    "bug": "bug.md",
-    "fix": "bug.md",
-    "feature": "feature.md",
-    "enhancement": "feature.md",
-    "docs": "docs.md",
-    "documentation": "docs.md",
-    "refactor": "refactor.md",
-    "cleanup": "refactor.md",
-    "test": "test.md",
-    "testing": "test.md",
-    "performance": "performance.md",
-    "optimization": "performance.md",
-    "security": "security.md",
+# The webhook server retains at most this many events; anything older in
+# an uncompacted log will never be served, so don't parse it either.
+_MAX_EVENTS = 100
+
+# Parsed events cache keyed by file mtime so repeated tool calls don't
+# re-parse an unchanged file. The workflow index is derived lazily once
+# per cache version.
+_events_cache = {"mtime": None, "data": None, "workflows": None}
+
+
+def _load_events() -> list:
+    """Return the parsed events list, reloading only when the file changed.
+
+    Only the tail of the log is kept and parsed, so memory stays bounded
+    however large the file grows between compactions.
+    """
+    st = EVENTS_FILE.stat()
+    if st.st_mtime_ns != _events_cache["mtime"]:
+        with open(EVENTS_FILE, "rb") as f:
+            tail = deque(f, maxlen=_MAX_EVENTS)
+        _events_cache["data"] = [orjson.loads(line) for line in tail if line.strip()]
+        _events_cache["mtime"] = st.st_mtime_ns
+        _events_cache["workflows"] = None
+    return _events_cache["data"]
+
+
+def _get_workflow_index() -> dict:
+    """Return {workflow name: latest run summary}, built once per cache
+    version instead of re-scanning the events list on every call."""
+    events = _load_events()
+    if _events_cache["workflows"] is None:
+        workflows = {}
+        for event in events:
+            run = event.get("workflow_run")
+            if run is None:
+                continue
+            name = run["name"]
+            if (
+                name not in workflows
+                or run["updated_at"] > workflows[name]["updated_at"]
+            ):
+                workflows[name] = {
+                    "name": name,
+                    "status": run["status"],
+                    "conclusion": run.get("conclusion"),
+                    "run_number": run["run_number"],
+                    "updated_at": run["updated_at"],
+                    "html_url": run["html_url"],
+                }
+        _events_cache["workflows"] = workflows
+    return _events_cache["workflows"]
+
+
+def _render_timestamp(event: dict) -> dict:
+    """Replace a raw timestamp_ns field with an ISO timestamp, copying so
+    the cached event is never mutated."""
+    if "timestamp_ns" not in event:
+        return event
+    rendered = {k: v for k, v in event.items() if k != "timestamp_ns"}
+    rendered["timestamp"] = datetime.fromtimestamp(
+        event["timestamp_ns"] / 1e9
+    ).isoformat()
+    return rendered
+
+
+# Template paths resolved to plain strings once, so reads skip the
+# Path-object and extra-stat overhead entirely.
+_TEMPLATE_PATHS = {
+    filename: os.fspath((TEMPLATES_DIR / filename).resolve())
+    for filename in DEFAULT_TEMPLATES
+}
+
+
+def _read_template(path: str) -> str:
+    with open(path, "rb") as f:
+        return f.read().decode()
+
+
+# Templates are static files; read and serialize them once at import so
+# tool calls never touch the disk. Keyed by filename for O(1) lookup in
+# suggest_template.
+_TEMPLATES_BY_FILE = {
+    filename: {
+        "filename": filename,
+        "type": template_type,
+        "content": _read_template(_TEMPLATE_PATHS[filename]),
+    }
+    for filename, template_type in DEFAULT_TEMPLATES.items()
 }
+_TEMPLATES_JSON = _dump(list(_TEMPLATES_BY_FILE.values()))
+
+TYPE_MAPPING = types.MappingProxyType(
+    {
+        "bug": "bug.md",
+        "fix": "bug.md",
+        "feature": "feature.md",
+        "enhancement": "feature.md",
+        "docs": "docs.md",
+        "documentation": "docs.md",
+        "refactor": "refactor.md",
+        "cleanup": "refactor.md",
+        "test": "test.md",
+        "testing": "test.md",
+        "performance": "performance.md",
+        "optimization": "performance.md",
+        "security": "security.md",
+    }
+)
+
+
+class _GitDaemon:
+    """Long-running `git cat-file --batch-check` helper.
+
+    Spawning git once and piping queries into it amortizes the fork/exec
+    cost of per-call ref resolution to effectively zero over a session.
+    """
+
+    def __init__(self):
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def _ensure_proc(self):
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(
+                [
+                    "git",
+                    "cat-file",
+                    "--batch-check=%(objectname) %(objecttype) %(objectsize)",
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+            )
+        return self._proc
+
+    def resolve(self, ref: str) -> Optional[tuple[str, str, int]]:
+        """Resolve a ref to (oid, type, size), or None if it doesn't exist."""
+        with self._lock:
+            proc = self._ensure_proc()
+            proc.stdin.write(ref + "\n")
+            proc.stdin.flush()
+            line = proc.stdout.readline().strip()
+        if not line or line.endswith(" missing"):
+            return None
+        oid, obj_type, size = line.split()
+        return oid, obj_type, int(size)
+
+    def close(self):
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+
+
+_git_daemon = _GitDaemon()
+atexit.register(_git_daemon.close)
+
+
+async def _run_git(*args: str) -> str:
+    """Run a git command and return its decoded stdout."""
+    proc = await asyncio.create_subprocess_exec(
+        "git",
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(
+            proc.returncode, ("git",) + args, output=stdout, stderr=stderr.decode()
+        )
+    return stdout.decode()
+
+
+def _parse_raw_numstat(output: str) -> tuple[str, str]:
+    """Parse `git diff --raw -z --numstat` output into name-status lines
+    and a shortstat-style summary.
+
+    The NUL-delimited stream carries raw records (colon-prefixed metadata
+    then path tokens) followed by numstat records (added, deleted, path),
+    so one subprocess yields both views of the diff.
+    """
+    tokens = output.split("\0")
+    files_changed = []
+    changed = insertions = deletions = 0
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if not token:
+            i += 1
+        elif token.startswith(":"):
+            status = token.rsplit(" ", 1)[-1]
+            path = tokens[i + 1]
+            i += 2
+            if status.startswith(("R", "C")):
+                path = f"{path}\t{tokens[i]}"
+                i += 1
+            files_changed.append(f"{status}\t{path}")
+        else:
+            parts = token.split("\t")
+            added, deleted = parts[0], parts[1]
+            # Rename/copy numstat records end in a bare trailing tab and
+            # carry their two paths as separate NUL tokens after the
+            # counts; skip those path tokens too.
+            i += 3 if parts[2] == "" else 1
+            changed += 1
+            if added != "-":
+                insertions += int(added)
+            if deleted != "-":
+                deletions += int(deleted)
+
+    statistics = ""
+    if changed:
+        statistics = (
+            f" {changed} files changed, "
+            f"{insertions} insertions(+), {deletions} deletions(-)\n"
+        )
+    return "\n".join(files_changed) + ("\n" if files_changed else ""), statistics
+
+
+async def _stream_git_diff(base_branch: str, max_diff_lines: int) -> tuple[str, bool]:
+    """Stream the diff and stop reading after max_diff_lines.
+
+    Returns the truncated diff content and whether truncation happened,
+    without ever materializing lines past the cap.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        "git",
+        "diff",
+        f"{base_branch}...HEAD",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        limit=1 << 20,
+    )
+    head = []
+    truncated = False
+    try:
+        while len(head) < max_diff_lines:
+            line = await proc.stdout.readline()
+            if not line:
+                break
+            head.append(line.decode().rstrip("\n"))
+        else:
+            # One sentinel read past the cap tells us whether more exists.
+            if await proc.stdout.readline():
+                truncated = True
+    finally:
+        if truncated:
+            proc.terminate()
+        await proc.wait()
+
+    diff_content = "\n".join(head)
+    if truncated:
+        diff_content += f"\n\n... Output truncated. Showing the first {max_diff_lines} lines ..."
+        diff_content += "\n... Use max_diff_lines parameter to see more ..."
+    return diff_content, truncated
 
 
 @mcp.tool()
@@ -54,74 +339,51 @@ async def analyze_file_changes(
         max_diff_lines: Maximum number of diff lines to include (default: 500)
     """
     try:
-
-        files_result = subprocess.run(
-            ["git", "diff", "--name-status", f"{base_branch}...HEAD"],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-
-        stat_result = subprocess.run(
-            ["git", "diff", "--stat", f"{base_branch}...HEAD"],
-            capture_output=True,
-            text=True,
+        # Resolve the base ref through the persistent git helper: rejects
+        # unknown branches up front without spawning the diff commands.
+        if _git_daemon.resolve(base_branch) is None:
+            return _dump({"error": f"Git error: unknown base branch '{base_branch}'"})
+
+        # One machine-parseable diff pass covers both the name-status view
+        # and the stat summary; it runs concurrently with the commit list.
+        meta_output, commits_output = await asyncio.gather(
+            _run_git("diff", "--raw", "-z", "--numstat", f"{base_branch}...HEAD"),
+            _run_git("log", "--oneline", f"{base_branch}..HEAD"),
         )
+        files_changed, statistics = _parse_raw_numstat(meta_output)
 
-        diff_content = ""
+        # Callers that opt out of the diff pay nothing for it: no
+        # subprocess, no counting, just a placeholder string.
+        diff_content = "Diff not included (set include_diff=true to see full diff)"
         truncated = False
+        total_diff_lines = 0
         if include_diff:
-            diff_result = subprocess.run(
-                ["git", "diff", f"{base_branch}...HEAD"], capture_output=True, text=True
+            diff_content, truncated = await _stream_git_diff(
+                base_branch, max_diff_lines
             )
-            diff_lines = diff_result.stdout.split("\n")
-            if len(diff_lines) > max_diff_lines:
-                diff_content = "\n".join(diff_lines[:max_diff_lines])
-                diff_content += f"\n\n... Output truncated. Showing {max_diff_lines} of {len(diff_lines)} lines ..."
-                diff_content += "\n... Use max_diff_lines parameter to see more ..."
-                truncated = True
-            else:
-                diff_content = diff_result.stdout
-
-        commits_result = subprocess.run(
-            ["git", "log", "--oneline", f"{base_branch}..HEAD"],
-            capture_output=True,
-            text=True,
-        )
+            total_diff_lines = diff_content.count("\n") + 1 if diff_content else 0
 
         analysis = {
             "base_branch": base_branch,
-            "files_changed": files_result.stdout,
-            "statistics": stat_result.stdout,
-            "commits": commits_result.stdout,
-            "diff": (
-                diff_content
-                if include_diff
-                else "Diff not included (set include_diff=true to see full diff)"
-            ),
+            "files_changed": files_changed,
+            "statistics": statistics,
+            "commits": commits_output,
+            "diff": diff_content,
             "truncated": truncated,
-            "total_diff_lines": len(diff_lines) if include_diff else 0,
+            "total_diff_lines": total_diff_lines,
         }
 
-        return json.dumps(analysis, indent=2)
+        return _dump(analysis)
     except subprocess.CalledProcessError as e:
-        return json.dumps({"error": f"Git error: {e.stderr}"})
+        return _dump({"error": f"Git error: {e.stderr}"})
     except Exception as e:
-        return json.dumps({"error": str(e)})
+        return _dump({"error": str(e)})
 
 
 @mcp.tool()
 async def get_pr_templates() -> str:
     """List available PR templates with their content."""
-    templates = [
-        {
-            "filename": filename,
-            "type": template_type,
-            "content": (TEMPLATES_DIR / filename).readtext(),
-        }
-        for filename, template_type in DEFAULT_TEMPLATES.item()
-    ]
-    return json.dumps(templates, indent=2)
+    return _TEMPLATES_JSON
 
 
 @mcp.tool()
@@ -133,12 +395,9 @@ async def suggest_template(changes_summary: str, change_type: str) -> str:
         change_type: The type of change you've identified (bug, feature, docs, refactor, test, etc.)
     """
 
-    template_response = await get_pr_templates()
-    templates = json.loads(template_response)
-
     template_file = TYPE_MAPPING.get(change_type.lower(), "feature.md")
-    selected_template = next(
-        (t for t in templates if t["filename"] == template_file), templates[0]
+    selected_template = _TEMPLATES_BY_FILE.get(
+        template_file, next(iter(_TEMPLATES_BY_FILE.values()))
     )
 
     suggestion = {
@@ -148,7 +407,7 @@ async def suggest_template(changes_summary: str, change_type: str) -> str:
         "usage_hint": "Claude can help you fill out this template based on the specific changes in your PR.",
     }
 
-    return json.dumps(suggestion, indent=2)
+    return _dump(suggestion)
 
 
 @mcp.tool()
@@ -159,45 +418,31 @@ async def get_recent_actions_events(limit: int = 10) -> str:
         limit: Maximum number of events to return (default: 10)
     """
     if not EVENTS_FILE.exists():
-        return json.dumps({"message": "No GitHub Actions events received yet"})
+        return _dump({"message": "No GitHub Actions events received yet"})
 
-    with open(EVENTS_FILE, "r") as f:
-        events = json.load(f)
+    events = _load_events()
 
-    recent = events[-limit:]
-    return json.dumps(recent, indent=2)
+    # The webhook stores raw epoch nanoseconds; render ISO strings here,
+    # only for the events actually returned.
+    recent = [_render_timestamp(event) for event in events[-limit:]]
+    return _dump(recent)
 
 
 @mcp.tool()
 async def get_workflow_status(workflow_name: Optional[str] = None) -> str:
     if not EVENTS_FILE.exists():
-        return json.dumps({"message": "No GitHub Actions events received yet"})
-
-    with open(EVENTS_FILE, "r") as f:
-        events = json.load(f)
+        return _dump({"message": "No GitHub Actions events received yet"})
 
-    if not events:
-        return json.dumps({"message": "No GitHub Actions events received yet"})
+    if not _load_events():
+        return _dump({"message": "No GitHub Actions events received yet"})
 
-    workflow_events = [e for e in events if e.get("workflow_run") is not None]
+    workflows = _get_workflow_index()
     if workflow_name:
-        workflow_events = [e for e in events if e.get("workflow_run") == workflow_name]
+        # Filter by the run's name, not the whole workflow_run dict.
+        workflow = workflows.get(workflow_name)
+        workflows = {workflow_name: workflow} if workflow else {}
 
-    workflows = {}
-    for event in workflow_events:
-        run = event["workflow_run"]
-        name = run["name"]
-        if name not in workflows or run["updated_at"] > workflows[name]["updated_at"]:
-            workflows[name] = {
-                "name": name,
-                "status": run["status"],
-                "conclusion": run.get("conclusion"),
-                "run_number": run["run_number"],
-                "updated_at": run["updated_at"],
-                "html_url": run["html_url"],
-            }
-
-    return json.dumps(workflows, indent=2)
+    return _dump(workflows)
 
 
 @mcp.tool()
@@ -213,16 +458,16 @@ async def send_slack_notification(message: str) -> str:
 
     try:
         payload = {"text": message, "mrkdwn": True}
-        response = requests.post(webhook_url, json=payload, timeout=2)
-
-        if response.status_code == 200:
-            return "Message sent successfully to Slack"
-        else:
-            return f"Failed to send message. Status: {response.status_code}"
+        session = await _get_http_session()
+        async with session.post(webhook_url, json=payload) as response:
+            if response.status == 200:
+                return "Message sent successfully to Slack"
+            else:
+                return f"Failed to send message. Status: {response.status}"
 
-    except requests.exceptions.Timeout:
+    except asyncio.TimeoutError:
         return "❌ Request timed out. Check your internet connection and try again."
-    except requests.exceptions.ConnectionError:
+    except aiohttp.ClientConnectionError:
         return "❌ Connection error. Check your internet connection and webhook URL."
     except Exception as e:
         return f"❌ Error sending message: {str(e)}"
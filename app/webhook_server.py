@@ -1,26 +1,91 @@
 """
 Simple webhook server for GitHub Actions events.
-Stores events in a JSON file that the MCP server can read.
+Appends events to a JSONL file that the MCP server can read.
 """
 
-import json
-from datetime import datetime
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+from collections import deque
 from pathlib import Path
 
+import aiohttp
+import orjson
 from aiohttp import web
 
 EVENTS_FILE = (
-    Path(__file__).parent.parent / "data" / "github_events" / "github_events.json"
+    Path(__file__).parent.parent / "data" / "github_events" / "github_events.jsonl"
 )
 
+MAX_EVENTS = 100
+
+# Optional shared secret; when set, requests must carry a valid
+# X-Hub-Signature-256 header or they are rejected before JSON parsing.
+WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
+
+# Recent events held in memory; the file is an append-only log compacted
+# back down to MAX_EVENTS lines periodically.
+_events: deque = deque(maxlen=MAX_EVENTS)
+_appends_since_compaction = 0
+
+# Serializes file writes so an append can't interleave with a compaction
+# rewrite from a concurrent handler.
+_write_lock = asyncio.Lock()
+
+
+def _load_events():
+    """Load the tail of the event log into memory at startup."""
+    EVENTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    if EVENTS_FILE.exists():
+        with open(EVENTS_FILE, "rb") as f:
+            for line in deque(f, maxlen=MAX_EVENTS):
+                _events.append(orjson.loads(line))
+
+
+def _compact_events(events):
+    """Rewrite the log from a snapshot of the deque, dropping old entries.
+
+    Takes a list rather than reading _events so the worker thread never
+    iterates the deque while handlers on the event loop append to it.
+    """
+    with open(EVENTS_FILE, "wb") as f:
+        for event in events:
+            f.write(orjson.dumps(event) + b"\n")
+
+
+def _valid_signature(raw: bytes, signature: str) -> bool:
+    """Check a GitHub X-Hub-Signature-256 header against the raw body."""
+    expected = (
+        "sha256="
+        + hmac.new(WEBHOOK_SECRET.encode(), raw, hashlib.sha256).hexdigest()
+    )
+    return hmac.compare_digest(expected, signature)
+
+
+def _append_event(event):
+    """Append a single event line to the log."""
+    with open(EVENTS_FILE, "ab") as f:
+        f.write(orjson.dumps(event) + b"\n")
+
 
 async def handle_webhook(request):
     """Handle incoming GitHub webhook"""
+    global _appends_since_compaction
     try:
-        data = await request.json()
+        # Verify the signature on the raw bytes before spending any CPU
+        # parsing the body.
+        raw = await request.read()
+        if WEBHOOK_SECRET:
+            signature = request.headers.get("X-Hub-Signature-256", "")
+            if not _valid_signature(raw, signature):
+                return web.json_response({"error": "invalid signature"}, status=401)
+        data = orjson.loads(raw)
 
+        # Raw epoch nanoseconds; readers format this for display.
         event = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp_ns": time.time_ns(),
             "event_type": request.headers.get("X-GitHub-Event", "unknown"),
             "action": data.get("action"),
             "workflow_run": data.get("workflow_run"),
@@ -29,29 +94,51 @@ async def handle_webhook(request):
             "sender": data.get("sender", {}).get("login"),
         }
 
-        events = []
-        if EVENTS_FILE.exists():
-            print("events exists here")
-            with open(EVENTS_FILE, "r") as f:
-                events = json.load(f)
-
-        events.append(event)
-        events = events[-100:]
-
-        with open(EVENTS_FILE, "w") as f:
-            print("events saved here")
-            json.dump(events, f, indent=2)
+        _events.append(event)
+        # File writes run in a worker thread so the event loop keeps
+        # serving requests during disk I/O; the lock keeps them from
+        # interleaving and from compacting twice at the same threshold.
+        async with _write_lock:
+            _appends_since_compaction += 1
+            if _appends_since_compaction >= MAX_EVENTS:
+                await asyncio.to_thread(_compact_events, list(_events))
+                _appends_since_compaction = 0
+            else:
+                await asyncio.to_thread(_append_event, event)
 
         return web.json_response({"status": "received"})
     except Exception as e:
         return web.json_response({"error": str(e)}, status=400)
 
 
-app = web.Application()
-app.router.add_post("/webhook/github", handle_webhook)
+async def _client_session_ctx(app):
+    """Attach a shared outbound ClientSession so any notifier calls reuse
+    one pooled connection; closed with the app."""
+    app["client_session"] = aiohttp.ClientSession()
+    yield
+    await app["client_session"].close()
+
+
+# Cap request bodies at 1 MiB so oversized payloads are rejected before
+# allocation; GitHub webhook payloads are far smaller.
+app = web.Application(client_max_size=1 << 20)
+app.cleanup_ctx.append(_client_session_ctx)
+app.add_routes([web.post("/webhook/github", handle_webhook)])
+
+
+async def _serve():
+    # AppRunner with access logging off and a deeper listen backlog
+    # handles webhook bursts with less per-request overhead.
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "localhost", 8080, backlog=512, reuse_port=True)
+    await site.start()
+    await asyncio.Event().wait()
+
 
 if __name__ == "__main__":
+    _load_events()
     print("🚀 Starting webhook server on http://localhost:8080")
     print("📝 Events will be saved to:", EVENTS_FILE)
     print("🔗 Webhook URL: http://localhost:8080/webhook/github")
-    web.run_app(app, host="localhost", port=8080)
+    asyncio.run(_serve())
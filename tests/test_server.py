@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from server import _parse_raw_numstat
+
+
+def test_parse_raw_numstat_plain_changes():
+    output = (
+        ":000000 100644 0000000 103f715 A\0.gitignore\0"
+        ":100644 100644 efbf15d 4c57819 M\0keep.txt\0"
+        "19\t0\t.gitignore\0"
+        "1\t2\tkeep.txt\0"
+    )
+    files_changed, statistics = _parse_raw_numstat(output)
+    assert files_changed == "A\t.gitignore\nM\tkeep.txt\n"
+    assert statistics == " 2 files changed, 20 insertions(+), 2 deletions(-)\n"
+
+
+def test_parse_raw_numstat_rename():
+    # Rename numstat records end in a bare trailing tab with the two
+    # paths following as separate NUL tokens.
+    output = (
+        ":100644 100644 efbf15d 4c57819 M\0keep.txt\0"
+        ":100644 100644 83db48f 83db48f R100\0old.py\0new.py\0"
+        "1\t0\tkeep.txt\0"
+        "0\t0\t\0old.py\0new.py\0"
+    )
+    files_changed, statistics = _parse_raw_numstat(output)
+    assert files_changed == "M\tkeep.txt\nR100\told.py\tnew.py\n"
+    assert statistics == " 2 files changed, 1 insertions(+), 0 deletions(-)\n"
+
+
+def test_parse_raw_numstat_empty_diff():
+    assert _parse_raw_numstat("") == ("", "")